@@ -0,0 +1,264 @@
+import argparse
+import csv
+import re
+import sys
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Set
+
+import numpy as np
+
+from carrier_routing import CarrierRouter
+from duplicate_index import phone_key
+from ticket_model import TicketRecord
+
+# MinHash signature = BANDS * ROWS_PER_BAND hashes; two descriptions with
+# Jaccard similarity s share an LSH bucket with probability 1 - (1 - s^ROWS)^BANDS
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.int64)
+_PERM_B = _rng.integers(0, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.int64)
+
+OPEN_STATUSES = {"new", "open", "pending", "hold", "on-hold"}
+# Numbers in the same NPA-NXX block within this many line numbers count as "consecutive"
+NEARBY_LINE_RANGE = 100
+MIN_DESCRIPTION_SIMILARITY = 0.5
+MIN_RELATED_SCORE = 0.5
+
+_WORD = re.compile(r"[a-z0-9#]+")
+_DIGITS = re.compile(r"\d+")
+
+
+def shingles(text: str, size: int = 2) -> Set[str]:
+    """Word n-grams of a description, with digits masked so rotating numbers/URLs still match."""
+    words = _WORD.findall(_DIGITS.sub("#", (text or "").lower()))
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(tokens: Set[str]) -> np.ndarray | None:
+    if not tokens:
+        return None
+    hashes = np.fromiter((zlib.crc32(t.encode()) & 0x7FFFFFFF for t in tokens), dtype=np.int64, count=len(tokens))
+    return ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+
+def band_keys(signature: np.ndarray) -> List[bytes]:
+    return [signature[i * ROWS_PER_BAND:(i + 1) * ROWS_PER_BAND].tobytes() for i in range(BANDS)]
+
+
+class CampaignRecord(TicketRecord):
+    """TicketRecord plus the clustering dimensions; ``phone_number`` holds the standardized number."""
+
+    __slots__ = ("carrier", "attack_vector", "signature")
+
+
+class CampaignIndex:
+    """
+    In-memory index for spotting scam campaigns across related numbers.
+
+    Tickets are indexed by NPA-NXX block (first six digits) and by MinHash
+    LSH buckets over their descriptions. ``related()`` gathers candidates
+    from both and scores them on block proximity, carrier, attack vector and
+    estimated description similarity, so a lookup touches only a handful of
+    tickets regardless of corpus size.
+
+    Parameters:
+    -----------
+    router : CarrierRouter or None
+        Normalizes carriers on both indexed tickets and queries, so verbatim
+        RealValidation strings in older mirror rows ("New Cingular Wireless
+        PCS, LLC") match the canonical carrier new tickets carry ("AT&T").
+        Defaults to the built-in aliases only.
+    """
+
+    def __init__(self, router: CarrierRouter | None = None):
+        self._router = router or CarrierRouter()
+        self._lock = threading.Lock()
+        self._tickets: Dict[str, CampaignRecord] = {}
+        self._by_block: Dict[str, Set[str]] = {}
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(BANDS)]
+
+    def add(self, ticket: Dict[str, Any]):
+        ticket_id = str(ticket.get("id") or "")
+        if not ticket_id:
+            return
+        phone = phone_key(str(ticket.get("phone_number") or ""))
+        signature = minhash(shingles(ticket.get("description") or ""))
+        record = CampaignRecord.from_api(ticket)
+        record.phone_number = phone
+        record.carrier = self._carrier(ticket.get("phone_number_provider"))
+        record.attack_vector = sys.intern((ticket.get("attack_vector") or "").strip().lower())
+        record.signature = signature
+        with self._lock:
+            self._remove(ticket_id)
+            self._tickets[ticket_id] = record
+            if len(phone) == 10:
+                self._by_block.setdefault(phone[:6], set()).add(ticket_id)
+            if signature is not None:
+                for band, key in zip(self._buckets, band_keys(signature)):
+                    band.setdefault(key, set()).add(ticket_id)
+
+    def _carrier(self, raw: str | None) -> str:
+        return sys.intern(self._router.route(raw).carrier.lower())
+
+    def _remove(self, ticket_id: str):
+        old = self._tickets.pop(ticket_id, None)
+        if old is None:
+            return
+        if len(old.phone_number) == 10:
+            self._by_block.get(old.phone_number[:6], set()).discard(ticket_id)
+        if old.signature is not None:
+            for band, key in zip(self._buckets, band_keys(old.signature)):
+                band.get(key, set()).discard(ticket_id)
+
+    def add_many(self, tickets: Iterable[Dict[str, Any]]):
+        for ticket in tickets:
+            self.add(ticket)
+
+    def update_statuses(self, tickets: Iterable[Dict[str, Any]]):
+        """Refresh statuses from ticket list pages (which carry no description)."""
+        with self._lock:
+            for ticket in tickets:
+                record = self._tickets.get(str(ticket.get("id")))
+                if record and ticket.get("status"):
+                    record.status = sys.intern(ticket["status"].lower())
+
+    def load_csv(self, path: Path) -> int:
+        """Index a ticket export CSV; returns rows read."""
+        count = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.add({**row, "id": row.get("ticket_id")})
+                count += 1
+        return count
+
+    def related(self, phone_number: str = "", carrier: str = "", attack_vector: str = "", description: str = "",
+                open_only: bool = True, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Find tickets likely to belong to the same campaign as a new submission.
+
+        Returns:
+        --------
+        list of dict
+            ``id``, ``status``, ``subject``, ``phone``, ``score`` (0-1) and
+            ``reasons``, best match first
+        """
+        phone = phone_key(phone_number or "")
+        carrier = self._carrier(carrier)
+        attack_vector = (attack_vector or "").strip().lower()
+        signature = minhash(shingles(description))
+
+        with self._lock:
+            candidates: Set[str] = set()
+            if len(phone) == 10:
+                candidates |= self._by_block.get(phone[:6], set())
+            if signature is not None:
+                for band, key in zip(self._buckets, band_keys(signature)):
+                    candidates |= band.get(key, set())
+
+            results = []
+            for ticket_id in candidates:
+                record = self._tickets[ticket_id]
+                if open_only and record.status not in OPEN_STATUSES:
+                    continue
+                if phone and record.phone_number == phone:
+                    # Exact duplicates are handled by the duplicate check
+                    continue
+                score, reasons = self._score(record, phone, carrier, attack_vector, signature)
+                if score >= MIN_RELATED_SCORE:
+                    results.append({
+                        "id": ticket_id,
+                        "status": record.status,
+                        "subject": record.subject,
+                        "phone": record.phone_number,
+                        "score": round(score, 2),
+                        "reasons": reasons,
+                    })
+
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:limit]
+
+    @staticmethod
+    def _score(record, phone, carrier, attack_vector, signature):
+        score, reasons = 0.0, []
+        if len(phone) == 10 and len(record.phone_number) == 10 and record.phone_number[:6] == phone[:6]:
+            score += 0.3
+            reasons.append(f"same NPA-NXX {phone[:3]}-{phone[3:6]}")
+            if abs(int(record.phone_number[6:]) - int(phone[6:])) <= NEARBY_LINE_RANGE:
+                score += 0.2
+                reasons.append("near-consecutive number")
+        if carrier and record.carrier == carrier:
+            score += 0.1
+            reasons.append("same carrier")
+        if attack_vector and record.attack_vector == attack_vector:
+            score += 0.1
+            reasons.append("same attack vector")
+        if signature is not None and record.signature is not None:
+            similarity = float(np.mean(signature == record.signature))
+            if similarity >= MIN_DESCRIPTION_SIMILARITY:
+                score += 0.5 * similarity
+                reasons.append(f"{similarity:.0%} similar description")
+        return min(score, 1.0), reasons
+
+    def clusters(self, min_size: int = 2, open_only: bool = True) -> List[List[str]]:
+        """
+        Group indexed tickets into campaigns.
+
+        Tickets are linked when they share an NPA-NXX block and carrier, or an
+        LSH bucket with an estimated description similarity above the threshold.
+        """
+        with self._lock:
+            ids = [i for i, r in self._tickets.items() if not open_only or r.status in OPEN_STATUSES]
+            parent = {i: i for i in ids}
+
+            def find(i):
+                while parent[i] != i:
+                    parent[i] = parent[parent[i]]
+                    i = parent[i]
+                return i
+
+            def union(a, b):
+                parent[find(a)] = find(b)
+
+            for members in self._by_block.values():
+                by_carrier: Dict[str, str] = {}
+                for i in members:
+                    if i in parent:
+                        first = by_carrier.setdefault(self._tickets[i].carrier, i)
+                        union(i, first)
+
+            for band in self._buckets:
+                for members in band.values():
+                    members = [i for i in members if i in parent]
+                    for other in members[1:]:
+                        a, b = self._tickets[members[0]].signature, self._tickets[other].signature
+                        if float(np.mean(a == b)) >= MIN_DESCRIPTION_SIMILARITY:
+                            union(members[0], other)
+
+            groups: Dict[str, List[str]] = {}
+            for i in ids:
+                groups.setdefault(find(i), []).append(i)
+        return sorted((g for g in groups.values() if len(g) >= min_size), key=len, reverse=True)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tickets)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report likely scam campaigns from a ticket export CSV")
+    parser.add_argument("csv_path", type=Path, help="Output of ticket_export.py")
+    parser.add_argument("--min-size", type=int, default=2)
+    parser.add_argument("--all", action="store_true", help="Include solved/closed tickets")
+    args = parser.parse_args()
+
+    index = CampaignIndex()
+    print(f"Indexed {index.load_csv(args.csv_path)} tickets")
+    for n, group in enumerate(index.clusters(args.min_size, open_only=not args.all), 1):
+        print(f"Campaign {n}: {len(group)} tickets — {', '.join(sorted(group, key=int))}")
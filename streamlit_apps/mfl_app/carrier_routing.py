@@ -0,0 +1,143 @@
+import difflib
+import re
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Tuple
+
+# Canonical carrier -> known spellings returned by RealValidation / entered by analysts.
+# MVNOs and acquired brands route to the network operator that handles takedowns.
+CARRIER_ALIASES = {
+    "AT&T": [
+        "AT&T", "ATT", "AT and T", "AT&T Wireless", "AT&T Mobility", "AT&T Mobility LLC",
+        "New Cingular Wireless", "New Cingular Wireless PCS", "Cingular", "Cricket", "Cricket Wireless",
+    ],
+    "T-Mobile": [
+        "T-Mobile", "TMobile", "T Mobile", "T-Mobile USA", "T-Mobile USA, Inc.", "Omnipoint",
+        "MetroPCS", "Metro by T-Mobile", "Sprint", "Sprint Spectrum", "Mint Mobile", "Google Fi",
+        "US Cellular", "United States Cellular",
+    ],
+    "Verizon": [
+        "Verizon", "Verizon Wireless", "Cellco Partnership", "Cellco Partnership dba Verizon Wireless",
+        "Visible", "Tracfone", "TracFone Wireless", "Straight Talk", "Total Wireless",
+    ],
+    "Bandwidth": ["Bandwidth", "Bandwidth.com", "Bandwidth.com CLEC", "Google Voice"],
+    "Twilio": ["Twilio", "Twilio Inc"],
+    "Inteliquent": ["Inteliquent", "Onvoy", "Onvoy LLC", "Neutral Tandem"],
+    "Lumen": ["Lumen", "Level 3", "Level 3 Communications", "CenturyLink"],
+}
+
+# Corporate suffixes that carry no routing information
+_NOISE_WORDS = {"inc", "llc", "corp", "corporation", "co", "company", "usa", "pcs", "clec", "dba"}
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+FUZZY_CUTOFF = 0.85
+
+
+class CarrierRoute(NamedTuple):
+    carrier: str
+    escalate_to: str | None
+    macro_id: int | None
+
+
+def carrier_tokens(raw: str) -> List[str]:
+    """Lower-case alphanumeric words of a carrier name ("AT&T Mobility, LLC" -> ["at", "t", "mobility", "llc"])."""
+    return _TOKEN.findall(raw.lower())
+
+
+def carrier_key(raw: str) -> str:
+    """Reduce a carrier name to a comparison key ("AT&T Mobility, LLC" -> "attmobility")."""
+    return "".join(t for t in carrier_tokens(raw) if t not in _NOISE_WORDS)
+
+
+def carrier_keys(raw: str) -> Tuple[str, str]:
+    """
+    Both comparison keys for a carrier name: with and without noise words.
+
+    Noise words only drop out when written as separate words, so "Metro PCS"
+    and "MetroPCS" share the unstripped key "metropcs" while "T-Mobile USA,
+    Inc." and "T-Mobile" share the stripped key "tmobile".
+    """
+    return "".join(carrier_tokens(raw)), carrier_key(raw)
+
+
+class CarrierRouter:
+    """
+    Normalizes raw carrier strings and resolves escalation routing.
+
+    All alias keys and per-carrier routes are computed once in ``__init__``;
+    ``route()`` is a dict lookup for known spellings and an LRU-cached fuzzy
+    match for anything else, so bulk runs resolve each distinct string once.
+
+    Parameters:
+    -----------
+    provider_mapping : dict
+        ``phone_provider_mapping`` from secrets. Keys are carrier names (any
+        spelling); values are either the ``escalate_to`` dropdown value or a
+        table with ``escalate_to`` and/or ``macro_id``.
+    default_macro_id : int or None
+        Tier macro used when the mapping does not name one for a carrier.
+    """
+
+    def __init__(self, provider_mapping: Dict[str, Any] | None = None, default_macro_id: int | None = None):
+        self._lookup: Dict[str, str] = {}
+        for canonical, aliases in CARRIER_ALIASES.items():
+            for alias in [canonical] + aliases:
+                for key in carrier_keys(alias):
+                    self._lookup.setdefault(key, canonical)
+
+        self._routes: Dict[str, CarrierRoute] = {
+            canonical: CarrierRoute(canonical, None, default_macro_id) for canonical in CARRIER_ALIASES
+        }
+        self._default_macro_id = default_macro_id
+        # Mapping keys are resolved through normalize(), so the built-in matcher must exist first
+        self._keys = list(self._lookup)
+        self._fuzzy = lru_cache(maxsize=4096)(self._fuzzy_match)
+
+        for name, target in (provider_mapping or {}).items():
+            canonical = self.normalize(name) or str(name).strip()
+            if isinstance(target, str):
+                escalate_to, macro_id = target, default_macro_id
+            else:
+                escalate_to = target.get("escalate_to")
+                macro_id = int(target["macro_id"]) if target.get("macro_id") else default_macro_id
+            self._routes[canonical] = CarrierRoute(canonical, escalate_to or None, macro_id)
+            for key in carrier_keys(canonical):
+                self._lookup.setdefault(key, canonical)
+        # Carriers only named in the mapping become match targets too
+        self._keys = list(self._lookup)
+        self._fuzzy.cache_clear()
+
+    def _fuzzy_match(self, tokens: Tuple[str, ...]) -> str | None:
+        # Brand names embedded in longer registrations ("Cellco Partnership dba Verizon Wireless"),
+        # matched on whole words only so "Sprintfield Telecom" is not read as Sprint.
+        # Longest run first, so "tmobile" wins over shorter aliases contained in it.
+        runs = {"".join(tokens[i:j]) for i in range(len(tokens)) for j in range(i + 1, len(tokens) + 1)}
+        for run in sorted(runs, key=len, reverse=True):
+            if run in self._lookup:
+                return self._lookup[run]
+        key = "".join(t for t in tokens if t not in _NOISE_WORDS)
+        matches = difflib.get_close_matches(key, self._keys, n=1, cutoff=FUZZY_CUTOFF)
+        return self._lookup[matches[0]] if matches else None
+
+    def normalize(self, raw: str | None) -> str | None:
+        """Return the canonical carrier for ``raw``, or None if it is not recognised."""
+        if not raw:
+            return None
+        tokens = carrier_tokens(raw)
+        if not tokens:
+            return None
+        full_key, key = carrier_keys(raw)
+        return self._lookup.get(full_key) or self._lookup.get(key) or self._fuzzy(tuple(tokens))
+
+    def route(self, raw: str | None) -> CarrierRoute:
+        """Resolve the canonical carrier, ``escalate_to`` value and tier macro for a raw carrier."""
+        canonical = self.normalize(raw)
+        if canonical is None:
+            return CarrierRoute((raw or "").strip(), None, self._default_macro_id)
+        return self._routes.get(canonical) or CarrierRoute(canonical, None, self._default_macro_id)
+
+
+if __name__ == "__main__":
+    router = CarrierRouter({"AT&T": "AT&T Fraud Team", "Verizon Wireless": {"escalate_to": "Verizon", "macro_id": 1}})
+    for name in ["AT&T Mobility LLC", "new cingular wireless pcs", "T-Mobile USA, Inc.", "Cellco Partnership",
+                 "Verizn Wireless", "Metro PCS", "Sprintfield Telecom", "Some Regional Telco"]:
+        print(name, "->", router.route(name))
@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the dependency's breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-dependency circuit breaker.
+
+    Trips to OPEN after ``failure_threshold`` consecutive failures, where a
+    call slower than ``latency_slo`` seconds also counts as a failure. While
+    OPEN, ``allow()`` refuses calls so callers can fail fast and degrade.
+    After ``reset_timeout`` seconds one probe call is let through
+    (HALF_OPEN); its success closes the breaker, its failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, latency_slo: float | None = None,
+                 reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.latency_slo = latency_slo
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open: let exactly one probe through
+            if self._probe_in_flight:
+                return False
+            self._state = HALF_OPEN
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, elapsed: float = 0.0):
+        """Record a completed call; one slower than the latency SLO counts as a failure."""
+        if self.latency_slo is not None and elapsed > self.latency_slo:
+            print(f"[WARN] {self.name} call took {elapsed:.1f}s (SLO {self.latency_slo:.1f}s)")
+            self.record_failure()
+            return
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"[INFO] {self.name} recovered, circuit closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"[WARN] {self.name} circuit opened after {self._failures} failure(s)")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Return the process-wide breaker for ``name``, creating it with ``kwargs`` on first use."""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
@@ -0,0 +1,63 @@
+import csv
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable
+
+from realvalidation import standardize_phone_number
+from ticket_model import TicketRecord
+
+
+def phone_key(phone_number: str) -> str:
+    """Standardized 10-digit number, or the bare digits if it is not a valid US number."""
+    try:
+        return standardize_phone_number(phone_number)
+    except ValueError:
+        return re.sub(r"\D", "", phone_number)
+
+
+class LocalDuplicateIndex:
+    """
+    In-process phone number -> tickets index used when the middleware is unavailable.
+
+    Fed from the local ticket mirror (a ``ticket_export.py`` CSV), ticket
+    list pages the app has loaded, and tickets created in this process.
+    ``lookup()`` returns the same shape as the middleware duplicate check.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_phone: Dict[str, Dict[str, TicketRecord]] = {}
+
+    def add(self, ticket: Dict[str, Any]):
+        phone_number = ticket.get("phone_number")
+        if not phone_number or ticket.get("id") in (None, ""):
+            return
+        key = phone_key(str(phone_number))
+        if not key:
+            return
+        record = TicketRecord.from_api(ticket)
+        with self._lock:
+            self._by_phone.setdefault(key, {})[str(record.id)] = record
+
+    def add_many(self, tickets: Iterable[Dict[str, Any]]):
+        for ticket in tickets:
+            self.add(ticket)
+
+    def load_csv(self, path: Path) -> int:
+        """Seed the index from a ticket export CSV; returns rows read."""
+        count = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.add({**row, "id": row.get("ticket_id")})
+                count += 1
+        return count
+
+    def lookup(self, phone_number: str) -> Dict[str, Any]:
+        with self._lock:
+            tickets = [r.summary() for r in self._by_phone.get(phone_key(phone_number), {}).values()]
+        return {"exists": bool(tickets), "count": len(tickets), "tickets": tickets, "source": "local"}
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(t) for t in self._by_phone.values())
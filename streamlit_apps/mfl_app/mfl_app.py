@@ -37,9 +37,25 @@ import importlib
 # CONFIGURATION
 # =====================================================
 from realvalidation import get_phone_provider
+from carrier_routing import CarrierRouter
+from zendesk_webhook import TicketEventStore, start_webhook_server
+from circuit_breaker import CircuitOpenError, get_breaker
+from duplicate_index import LocalDuplicateIndex
+from campaign_clusters import CampaignIndex
+from ticket_model import TicketRecord, latest_public_comment, loads
+from provider_backfill import enqueue_enrichment
 
 MIDDLEWARE_URL = "http://localhost:8000"  # Adjust for your setup
 STATUS_POLLING_INTERVAL = 30
+# Dropdowns larger than this get server-side type-ahead instead of the full list
+LARGE_DROPDOWN_THRESHOLD = 200
+TYPEAHEAD_RESULT_LIMIT = 50
+# Trip after 3 consecutive errors or calls slower than 5s; probe again after 30s
+MIDDLEWARE_BREAKER_SETTINGS = {"failure_threshold": 3, "latency_slo": 5.0, "reset_timeout": 30.0}
+# Ticket export (python ticket_export.py exports/tickets.csv --incremental) used as the local mirror
+LOCAL_TICKET_MIRROR = Path("exports/tickets.csv")
+# Decoded ticket list pages are reused across reruns for this long
+TICKET_PAGE_TTL = 60
 import os
 
 # Prevent setuptools-scm from throwing version lookup errors
@@ -64,17 +80,71 @@ MACRO_CONFIG = {
 }
 
 
+def middleware_breaker():
+    return get_breaker("middleware", **MIDDLEWARE_BREAKER_SETTINGS)
+
+
+@st.cache_resource
+def get_duplicate_index() -> LocalDuplicateIndex:
+    """Local duplicate index, seeded once from the ticket mirror when it exists."""
+    index = LocalDuplicateIndex()
+    if LOCAL_TICKET_MIRROR.exists():
+        try:
+            count = index.load_csv(LOCAL_TICKET_MIRROR)
+            print(f"[INFO] Loaded {count} tickets into local duplicate index")
+        except Exception as e:
+            print(f"[WARN] Could not load {LOCAL_TICKET_MIRROR}: {e}")
+    return index
+
+
+@st.cache_resource
+def get_campaign_index() -> CampaignIndex:
+    """Campaign clustering index over the local ticket mirror, built once per server process."""
+    config = load_zendesk_config() or {}
+    index = CampaignIndex(get_carrier_router(config.get("phone_provider_mapping", {})))
+    if LOCAL_TICKET_MIRROR.exists():
+        try:
+            count = index.load_csv(LOCAL_TICKET_MIRROR)
+            print(f"[INFO] Loaded {count} tickets into campaign index")
+        except Exception as e:
+            print(f"[WARN] Could not load {LOCAL_TICKET_MIRROR}: {e}")
+    return index
+
+
 def check_phone_duplicate_via_middleware(phone_number: str):
-    """Check if phone number exists via middleware."""
+    """Check if phone number exists via middleware, falling back to the local index while it is down."""
+    breaker = middleware_breaker()
+    if not breaker.allow():
+        st.warning("⚠️ Middleware unavailable — checked the local duplicate index only.")
+        return get_duplicate_index().lookup(phone_number)
+
+    start = time.monotonic()
     try:
         resp = requests.post(
             f"{MIDDLEWARE_URL}/mfl/check_phone_duplicate",
             json={"phone_number": phone_number},
             timeout=30
         )
+    except requests.exceptions.Timeout:
+        breaker.record_failure()
+        st.error("⏱️ Timeout while checking for duplicates (>30s)")
+        return {"exists": False, "error": "Timeout"}
+    except Exception as e:
+        breaker.record_failure()
+        st.error(f"❌ Error checking duplicates: {e}")
+        return {"exists": False, "error": str(e)}
+    except BaseException:
+        breaker.record_failure()
+        raise
 
-        st.info(f"🔍 Duplicate check response status: {resp.status_code}")
+    # 4xx means the middleware is up; only server errors count against it
+    if resp.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success(time.monotonic() - start)
 
+    st.info(f"🔍 Duplicate check response status: {resp.status_code}")
+    try:
         if resp.status_code == 200:
             result = resp.json()
             st.info(f"📊 Duplicate check result: {result}")
@@ -83,10 +153,7 @@ def check_phone_duplicate_via_middleware(phone_number: str):
             error_msg = f"Status {resp.status_code}: {resp.text[:200]}"
             st.warning(f"⚠️ Could not check for duplicates: {error_msg}")
             return {"exists": False, "error": error_msg}
-    except requests.exceptions.Timeout:
-        st.error("⏱️ Timeout while checking for duplicates (>30s)")
-        return {"exists": False, "error": "Timeout"}
-    except Exception as e:
+    except ValueError as e:
         st.error(f"❌ Error checking duplicates: {e}")
         return {"exists": False, "error": str(e)}
 
@@ -96,16 +163,26 @@ def check_phone_duplicate_via_middleware(phone_number: str):
 # =====================================================
 
 def lazy_get_phone_provider(phone_number: str) -> str | None:
-    """Safely import and call realvalidation.get_phone_provider at runtime."""
+    """
+    Safely import and call realvalidation.lookup_phone_provider at runtime.
+
+    Returns the carrier, "" when there is none to find (no carrier on record
+    or not a valid US number), or None when the lookup failed and the ticket
+    should be queued for enrichment.
+    """
     try:
         os.environ.setdefault("SETUPTOOLS_SCM_PRETEND_VERSION_FOR_REALVALIDATION", "1.0.0")
         # realvalidation = importlib.import_module("realvalidation")
         # func = getattr(realvalidation, "get_phone_provider", None)
-        from realvalidation import get_phone_provider
-
-        func = get_phone_provider
-        if func:
-            return func(phone_number)
+        from realvalidation import lookup_phone_provider
+
+        return lookup_phone_provider(phone_number)
+    except CircuitOpenError:
+        # Caller degrades (queues enrichment) rather than treating this as "no carrier"
+        raise
+    except ValueError:
+        # Not a valid US number: a later lookup would fail the same way
+        return ""
     except Exception as e:
         print(f"[WARN1] Lazy load of realvalidation failed: {e}")
     return None
@@ -129,6 +206,10 @@ def load_zendesk_config() -> Dict[str, Any] | None:
             "form_id": z["form_id"],
             "custom_fields": z.get("custom_fields", {}),
             "phone_provider_mapping": z.get("phone_provider_mapping", {}),
+            # Optional: enables the webhook receiver instead of status polling
+            "webhook_secret": z.get("webhook_secret"),
+            "webhook_host": z.get("webhook_host", "127.0.0.1"),
+            "webhook_port": int(z.get("webhook_port", 8765)),
         }
         # Keep only set custom fields
         cfg["custom_fields"] = {k: v for k, v in cfg["custom_fields"].items() if v}
@@ -138,17 +219,38 @@ def load_zendesk_config() -> Dict[str, Any] | None:
         return None
 
 
+@st.cache_resource
+def get_carrier_router(_provider_mapping: Dict[str, Any]) -> CarrierRouter:
+    """Build the carrier lookup/routing table once per server process."""
+    return CarrierRouter(_provider_mapping, default_macro_id=MACRO_CONFIG["open"]["id"])
+
+
+@st.cache_resource
+def get_webhook_store(secret: str | None, host: str, port: int) -> TicketEventStore | None:
+    """Start the Zendesk webhook receiver once per server process (None when not configured)."""
+    if not secret:
+        return None
+    store = TicketEventStore()
+    try:
+        start_webhook_server(secret, store, host=host, port=port)
+    except OSError as e:
+        print(f"[WARN] Could not start webhook receiver on {host}:{port}: {e}")
+        return None
+    return store
+
+
 def zendesk_auth(config: Dict[str, str]):
     return (f"{config['email']}/token", config["api_token"])
 
 
 def get_ticket_status(ticket_id: str, config: Dict[str, str]):
-    """Fetch Zendesk ticket status with error handling."""
+    """Fetch Zendesk ticket status with error handling; ``ticket`` is a decoded TicketRecord."""
     try:
         url = f"https://{config['subdomain']}.zendesk.com/api/v2/tickets/{ticket_id}.json"
         resp = requests.get(url, auth=zendesk_auth(config))
         if resp.status_code == 200:
-            return resp.json()
+            phone_fid = str(config.get("custom_fields", {}).get("phone_number_field_id", ""))
+            return {"ticket": TicketRecord.decode(resp.content, phone_fid)}
         else:
             print(f"[WARN] Status fetch failed {resp.status_code}: {resp.text}")
             return {"error": resp.text}
@@ -157,16 +259,17 @@ def get_ticket_status(ticket_id: str, config: Dict[str, str]):
         return {"error": str(e)}
 
 
-def get_ticket_comments(ticket_id: str, config: Dict[str, str]):
+def get_latest_comment(ticket_id: str, config: Dict[str, str]) -> str | None:
+    """Body of the latest public comment (the full comment list is not kept)."""
     try:
         url = f"https://{config['subdomain']}.zendesk.com/api/v2/tickets/{ticket_id}/comments.json"
         resp = requests.get(url, auth=zendesk_auth(config))
         if resp.status_code == 200:
-            return resp.json().get("comments", [])
-        return []
+            return latest_public_comment(resp.content)
+        return None
     except Exception as e:
-        print(f"[ERROR] get_ticket_comments: {e}")
-        return []
+        print(f"[ERROR] get_latest_comment: {e}")
+        return None
 
 
 def update_ticket_with_macro(ticket_id: str, macro_id: int, config: Dict[str, str]):
@@ -215,10 +318,73 @@ def fetch_form_fields():
         return {"success": False}
 
 
+@st.cache_resource(ttl=300)
+def build_form_options() -> Dict[str, Any]:
+    """
+    Preprocess dropdown options from the middleware into immutable lookups.
+
+    Cached as a resource so every rerun shares the same tuples instead of
+    rebuilding ``[""] + options`` lists for each field.
+    """
+    field_data = fetch_form_fields()
+    options = {
+        str(fid): ("",) + tuple(opts)
+        for fid, opts in field_data.get("dropdown_options", {}).items()
+    }
+    return {
+        "options": options,
+        "labels": {str(fid): meta.get("title") for fid, meta in field_data.get("field_mapping", {}).items()
+                   if meta.get("title")},
+        # Lower-cased copies for type-ahead search on large dropdowns
+        "search": {fid: tuple(str(o).lower() for o in opts) for fid, opts in options.items()
+                   if len(opts) > LARGE_DROPDOWN_THRESHOLD},
+    }
+
+
+@st.cache_data(ttl=300, max_entries=1000)
+def search_field_options(fid: str, query: str, limit: int = TYPEAHEAD_RESULT_LIMIT) -> tuple:
+    """Server-side type-ahead: prefix matches first, then substring matches, capped at ``limit``."""
+    form_options = build_form_options()
+    options = form_options["options"].get(fid, ("",))
+    query = query.strip().lower()
+    if not query:
+        return options[:limit + 1]
+
+    lowered = form_options["search"].get(fid) or tuple(str(o).lower() for o in options)
+    prefix, contains = [], []
+    for opt, low in zip(options[1:], lowered[1:]):
+        if low.startswith(query):
+            prefix.append(opt)
+        elif query in low:
+            contains.append(opt)
+        if len(prefix) >= limit:
+            break
+    return ("",) + tuple((prefix + contains)[:limit])
+
+
 def create_ticket_via_middleware(payload: Dict[str, Any]):
     """Create ticket via middleware (which maps display → internal values)"""
+    breaker = middleware_breaker()
+    if not breaker.allow():
+        return {"success": False, "error": "Middleware unavailable (circuit open), try again shortly"}
+
+    start = time.monotonic()
+    try:
+        resp = requests.post(f"{MIDDLEWARE_URL}/mfl/create_ticket", json=payload, timeout=30)
+    except requests.exceptions.RequestException as e:
+        breaker.record_failure()
+        st.error(f"Error contacting middleware: {e}")
+        return {"success": False}
+    except BaseException:
+        breaker.record_failure()
+        raise
+
+    if resp.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success(time.monotonic() - start)
+
     try:
-        resp = requests.post(f"{MIDDLEWARE_URL}/mfl/create_ticket", json=payload)
         st.error(f"response is {resp.json()}")
         if resp.status_code == 200:
             return resp.json()
@@ -233,10 +399,33 @@ def create_ticket_via_middleware(payload: Dict[str, Any]):
 def create_ticket_flow(ticket_payload: Dict[str, Any], zendesk_config: Dict[str, Any]):
     """Execute the actual ticket creation with provider lookup and macro application."""
     # Auto populate phone provider (hidden field)
+    st.session_state["tier_macro_id"] = None
+    st.session_state["tier_macro_carrier"] = None
+    needs_enrichment = False
     if PHONE_PROVIDER_AVAILABLE and ticket_payload.get("phone_number"):
-        provider_name = lazy_get_phone_provider(ticket_payload["phone_number"])
+        try:
+            provider_name = lazy_get_phone_provider(ticket_payload["phone_number"])
+        except CircuitOpenError:
+            provider_name = None
+        # None: the lookup failed or RealValidation is marked down; "" means there is no carrier to fill in
+        if provider_name is None:
+            st.warning("⚠️ Phone provider lookup unavailable — provider will be filled in later.")
+            needs_enrichment = True
         if provider_name:
-            ticket_payload["phone_number_provider"] = provider_name
+            route = get_carrier_router(zendesk_config.get("phone_provider_mapping", {})).route(provider_name)
+            ticket_payload["phone_number_provider"] = route.carrier
+            # Analyst's explicit choice wins over the carrier default
+            if route.escalate_to and not ticket_payload.get("escalate_to"):
+                ticket_payload["escalate_to"] = route.escalate_to
+            st.session_state["tier_macro_id"] = route.macro_id
+            st.session_state["tier_macro_carrier"] = route.carrier
+            # The submit-time campaign check ran before the carrier was known; score it in now
+            st.session_state["campaign_matches"] = get_campaign_index().related(
+                phone_number=ticket_payload["phone_number"],
+                carrier=route.carrier,
+                attack_vector=ticket_payload.get("attack_vector") or "",
+                description=ticket_payload.get("description") or "",
+            )
 
     st.info("Submitting ticket to middleware...")
     result = create_ticket_via_middleware(ticket_payload)
@@ -250,11 +439,24 @@ def create_ticket_flow(ticket_payload: Dict[str, Any], zendesk_config: Dict[str,
         st.session_state["ticket_url"] = ticket_url
         st.session_state["last_status"] = "new"
 
+        get_duplicate_index().add({
+            "id": ticket_id,
+            "phone_number": ticket_payload.get("phone_number"),
+            "status": "new",
+            "subject": ticket_payload.get("subject"),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        })
+        get_campaign_index().add({**ticket_payload, "id": ticket_id, "status": "new"})
+        st.session_state.pop("ticket_pages", None)
+        if needs_enrichment:
+            enqueue_enrichment(ticket_id, ticket_payload["phone_number"])
+
         # Clear duplicate confirmation state
         st.session_state["duplicate_confirmed"] = False
         st.session_state["pending_ticket_data"] = None
         st.session_state["last_phone_number"] = None
         st.session_state["show_duplicate_warning"] = False
+        st.session_state["show_campaign_warning"] = False
 
         # Apply initial macro (NEW)
         with st.spinner("Applying initial macro..."):
@@ -287,11 +489,23 @@ if "show_duplicate_warning" not in st.session_state:
     st.session_state["show_duplicate_warning"] = False
 if "duplicate_check_result" not in st.session_state:
     st.session_state["duplicate_check_result"] = None
+if "show_campaign_warning" not in st.session_state:
+    st.session_state["show_campaign_warning"] = False
 
 # Persistent ticket link (survives reruns)
 if "ticket_id" in st.session_state and "ticket_url" in st.session_state:
     st.success(f"✅ Ticket created successfully! [View in Zendesk]({st.session_state['ticket_url']})")
 
+# Possible campaign for the last submission (survives the create/duplicate reruns)
+if st.session_state.get("campaign_matches"):
+    matches = st.session_state["campaign_matches"]
+    with st.expander(f"🧩 {len(matches)} related open ticket(s) — possible campaign", expanded=True):
+        for match in matches:
+            st.markdown(
+                f"- **Ticket #{match['id']}** `{match['status'].upper()}` · {match['phone']} · "
+                f"score {match['score']:.2f} ({', '.join(match['reasons'])}) — {match['subject']}"
+            )
+
 zendesk_config = load_zendesk_config()
 if not zendesk_config:
     st.stop()
@@ -302,9 +516,8 @@ if not field_data.get("success"):
 
 st.success("✅ Zendesk form fields loaded via middleware.")
 
-# Shortcuts to field metadata from middleware
-dropdown_options: Dict[str, list] = field_data.get("dropdown_options", {})
-field_mapping: Dict[str, Dict[str, Any]] = field_data.get("field_mapping", {})
+# Dropdown options and labels, preprocessed once per form_fields fetch
+form_options = build_form_options()
 # NOTE: middleware already filtered to only configured fields
 
 # Map each configured logical field to its Zendesk field id
@@ -320,11 +533,32 @@ provider_fid = str(cf.get("phone_number_provider_field_id", ""))  # hidden in UI
 
 
 def label_for(fid: str, fallback: str) -> str:
-    return field_mapping.get(fid, {}).get("title", fallback)
+    return form_options["labels"].get(fid, fallback)
+
+
+def options_for(fid: str) -> tuple:
+    """Dropdown choices with the leading blank option (shared, immutable)."""
+    return form_options["options"].get(fid, ("",))
+
 
+def is_large_dropdown(fid: str) -> bool:
+    return len(options_for(fid)) > LARGE_DROPDOWN_THRESHOLD
 
-def options_for(fid: str) -> list:
-    return dropdown_options.get(fid, [])
+
+def dropdown_input(fid: str, fallback: str, always_dropdown: bool = False):
+    """Render a configured dropdown as a selectbox, or a text input when it has no options."""
+    if not fid or not (always_dropdown or len(options_for(fid)) > 1):
+        return st.text_input(fallback)
+    if is_large_dropdown(fid):
+        # Only the capped type-ahead matches are sent to the browser
+        query = st.session_state.get(f"search_{fid}", "")
+        matches = search_field_options(fid, query)
+        # Keep the current selection valid when a new search no longer matches it
+        selected = st.session_state.get(f"select_{fid}")
+        if selected and selected not in matches:
+            matches = matches + (selected,)
+        return st.selectbox(label_for(fid, fallback), matches, key=f"select_{fid}")
+    return st.selectbox(label_for(fid, fallback), options_for(fid), key=f"select_{fid}")
 
 
 # -----------------------------------------------------
@@ -400,6 +634,46 @@ if st.session_state.get("show_duplicate_warning"):
 
     st.stop()  # Don't show the form when warning is displayed
 
+# -----------------------------------------------------
+# Possible campaign: confirm before filing one more ticket (outside form)
+# -----------------------------------------------------
+if st.session_state.get("show_campaign_warning"):
+    pending_data = st.session_state.get("pending_ticket_data")
+    matches = st.session_state.get("campaign_matches") or []
+
+    st.warning(
+        f"🧩 {len(matches)} related open ticket(s) look like the same campaign as "
+        f"**{pending_data.get('phone_number') or 'this submission'}** (listed above). "
+        "Consider adding this number to one of them instead of filing a new ticket."
+    )
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        st.error("**Do you still want to create a separate ticket?**")
+    with col2:
+        if st.button("⚠️ Create Anyway", type="primary", use_container_width=True, key="campaign_create_btn"):
+            create_ticket_flow(pending_data, zendesk_config)
+            st.stop()
+    with col3:
+        if st.button("❌ Cancel", use_container_width=True, key="campaign_cancel_btn"):
+            st.session_state["show_campaign_warning"] = False
+            st.session_state["pending_ticket_data"] = None
+            st.session_state["campaign_matches"] = []
+            st.rerun()
+
+    st.stop()
+
+# -----------------------------------------------------
+# Type-ahead search for large dropdowns (outside form so it reruns)
+# -----------------------------------------------------
+large_fids = [fid for fid in (client_fid, sources_fid, attack_fid, cta_fid, resolution_fid, escalate_fid)
+              if fid and is_large_dropdown(fid)]
+if large_fids:
+    search_cols = st.columns(len(large_fids))
+    for col, fid in zip(search_cols, large_fids):
+        col.text_input(f"🔎 Search {label_for(fid, 'options')}", key=f"search_{fid}",
+                       help=f"Shows up to {TYPEAHEAD_RESULT_LIMIT} matches")
+
 # -----------------------------------------------------
 # Ticket Creation Form with dynamic dropdowns
 # -----------------------------------------------------
@@ -414,38 +688,26 @@ with st.form("create_ticket_form"):
 
     with col1:
         # Client — dropdown
-        client_opts = [""] + options_for(client_fid) if client_fid else [""]
-        client = st.selectbox(label_for(client_fid, "Client *"), client_opts) if client_fid else st.text_input(
-            "Client *")
+        client = dropdown_input(client_fid, "Client *", always_dropdown=True)
 
         # Phone number — plain text
         phone_number = st.text_input("Phone Number")
 
         # Sources — dropdown or text based on field type/options
-        sources_opts = [""] + options_for(sources_fid) if sources_fid else [""]
-        sources = st.selectbox(label_for(sources_fid, "Sources"), sources_opts) if sources_fid and len(
-            sources_opts) > 1 else st.text_input("Sources")
+        sources = dropdown_input(sources_fid, "Sources")
 
     with col2:
         # Attack Vector — dropdown
-        attack_opts = [""] + options_for(attack_fid) if attack_fid else [""]
-        attack_vector = st.selectbox(label_for(attack_fid, "Attack Vector"),
-                                     attack_opts) if attack_fid else st.text_input("Attack Vector")
+        attack_vector = dropdown_input(attack_fid, "Attack Vector", always_dropdown=True)
 
         # Call to Action — dropdown/text
-        cta_opts = [""] + options_for(cta_fid) if cta_fid else [""]
-        call_to_action = st.selectbox(label_for(cta_fid, "Call To Action"), cta_opts) if cta_fid and len(
-            cta_opts) > 1 else st.text_input("Call To Action")
+        call_to_action = dropdown_input(cta_fid, "Call To Action")
 
         # Resolution — dropdown/text
-        res_opts = [""] + options_for(resolution_fid) if resolution_fid else [""]
-        resolution = st.selectbox(label_for(resolution_fid, "Resolution"), res_opts) if resolution_fid and len(
-            res_opts) > 1 else st.text_input("Resolution")
+        resolution = dropdown_input(resolution_fid, "Resolution")
 
     # Escalate To — dropdown/text (full width)
-    esc_opts = [""] + options_for(escalate_fid) if escalate_fid else [""]
-    escalate_to = st.selectbox(label_for(escalate_fid, "Escalate To"), esc_opts) if escalate_fid and len(
-        esc_opts) > 1 else st.text_input("Escalate To")
+    escalate_to = dropdown_input(escalate_fid, "Escalate To")
 
     submitted = st.form_submit_button("📨 Create Ticket")
 
@@ -472,6 +734,15 @@ if submitted:
         "escalate_to": escalate_to.strip() if isinstance(escalate_to, str) else escalate_to,
     }
 
+    # Related open tickets from the same number block / campaign (local index, no API calls).
+    # The carrier is not known until create_ticket_flow looks it up, which re-runs this with it.
+    related = get_campaign_index().related(
+        phone_number=ticket_payload["phone_number"],
+        attack_vector=ticket_payload["attack_vector"] or "",
+        description=description,
+    )
+    st.session_state["campaign_matches"] = related
+
     # Check for duplicate phone number BEFORE creating ticket
     if phone_number and phone_number.strip():
         st.info(f"🔍 Checking for duplicates with phone: **{phone_number.strip()}**")
@@ -482,15 +753,19 @@ if submitted:
 
         # If duplicates found or error, store data and show warning
         if duplicate_check.get("error") or duplicate_check.get("exists"):
+            # The duplicate warning is shown under the campaign matches, so both are confirmed at once
             st.session_state["pending_ticket_data"] = ticket_payload
             st.session_state["duplicate_check_result"] = duplicate_check
             st.session_state["show_duplicate_warning"] = True
             st.rerun()
-        else:
-            # No duplicates, create ticket directly
-            create_ticket_flow(ticket_payload, zendesk_config)
+
+    if related:
+        # Possible campaign: let the analyst decide before a ticket is filed
+        st.session_state["pending_ticket_data"] = ticket_payload
+        st.session_state["show_campaign_warning"] = True
+        st.rerun()
     else:
-        # No phone number, create ticket directly
+        # No duplicates or related tickets, create ticket directly
         create_ticket_flow(ticket_payload, zendesk_config)
 
 # =============================================================================
@@ -520,6 +795,7 @@ with col2:
 
 with col3:
     if st.button("🔄 Refresh", key="refresh_tickets"):
+        st.session_state.pop("ticket_pages", None)
         st.rerun()
 
 # Initialize session state
@@ -543,7 +819,13 @@ if page_size != st.session_state["last_page_size"]:
 
 
 def fetch_tickets(page: int, page_size: int, status: str = None):
-    """Fetch tickets from middleware"""
+    """Fetch tickets from middleware, reusing the decoded page for TICKET_PAGE_TTL seconds"""
+    pages = st.session_state.setdefault("ticket_pages", {})
+    cache_key = (page, page_size, status)
+    cached = pages.get(cache_key)
+    if cached and time.monotonic() - cached[0] < TICKET_PAGE_TTL:
+        return cached[1]
+
     try:
         params = {
             "page": page,
@@ -559,7 +841,16 @@ def fetch_tickets(page: int, page_size: int, status: str = None):
         )
 
         if resp.status_code == 200:
-            return resp.json()
+            data = loads(resp.content)
+            # Keep the local duplicate index warm for middleware outages
+            get_duplicate_index().add_many(data.get("tickets", []))
+            get_campaign_index().update_statuses(data.get("tickets", []))
+            data["tickets"] = [TicketRecord.from_api(t) for t in data.get("tickets", [])]
+            now = time.monotonic()
+            for key in [k for k, (fetched, _) in pages.items() if now - fetched >= TICKET_PAGE_TTL]:
+                del pages[key]
+            pages[cache_key] = (now, data)
+            return data
         else:
             st.error(f"Failed to fetch tickets: {resp.status_code}")
             return {"success": False, "tickets": [], "total": 0}
@@ -596,25 +887,14 @@ if ticket_data.get("success"):
         # Create formatted data for display
         display_data = []
         for ticket in tickets:
-            # Format dates
-            try:
-                created = datetime.fromisoformat(ticket['created_at'].replace('Z', '+00:00'))
-                updated = datetime.fromisoformat(ticket['updated_at'].replace('Z', '+00:00'))
-                created_str = created.strftime("%Y-%m-%d %H:%M:%S")
-                updated_str = updated.strftime("%Y-%m-%d %H:%M:%S")
-            except:
-                created_str = ticket.get('created_at', 'N/A')
-                updated_str = ticket.get('updated_at', 'N/A')
-
-            status = ticket.get('status', 'unknown')
-            status_emoji = status_emojis.get(status, '❓')
+            status_emoji = status_emojis.get(ticket.status, '❓')
 
             display_data.append({
-                "Ticket #": ticket['id'],
-                "Phone Number": ticket.get('phone_number', 'N/A'),
-                "Status": f"{status_emoji} {status.title()}",
-                "Created": created_str,
-                "Updated": updated_str,
+                "Ticket #": ticket.id,
+                "Phone Number": ticket.phone_number or 'N/A',
+                "Status": f"{status_emoji} {ticket.status.title()}",
+                "Created": ticket.created_display,
+                "Updated": ticket.updated_display,
             })
 
         # Display as dataframe
@@ -632,7 +912,7 @@ if ticket_data.get("success"):
         # Add links below table
         with st.expander("🔗 View Tickets in Zendesk"):
             for ticket in tickets:
-                st.markdown(f"- [Ticket #{ticket['id']}]({ticket['url']}) - {ticket.get('subject', 'N/A')}")
+                st.markdown(f"- [Ticket #{ticket.id}]({ticket.url}) - {ticket.subject}")
 
         # Pagination controls
         st.markdown("---")
@@ -701,53 +981,77 @@ if "ticket_id" in st.session_state:
     ticket_id = st.session_state["ticket_id"]
     last_status = st.session_state.get("last_status", "unknown")
 
-    with st.spinner("Fetching current status..."):
-        ticket_data = get_ticket_status(ticket_id, zendesk_config)
-        if "ticket" in ticket_data:
-            current_status = ticket_data["ticket"].get("status", "unknown")
-            created_at = ticket_data["ticket"].get("created_at")
-            updated_at = ticket_data["ticket"].get("updated_at")
-            subject_display = ticket_data["ticket"].get("subject", "N/A")
-        else:
-            st.error(f"Failed to fetch status: {ticket_data.get('error')}")
-            st.stop()
+    webhook_store = get_webhook_store(zendesk_config.get("webhook_secret"), zendesk_config["webhook_host"],
+                                      zendesk_config["webhook_port"])
+    event = webhook_store.get(ticket_id) if webhook_store else None
+    event_version = event["version"] if event else 0
+
+    # With the webhook receiver running, Zendesk is only queried after an event arrives
+    cached_ticket = st.session_state.get("monitor_ticket")
+    if (webhook_store is None or cached_ticket is None
+            or str(cached_ticket.id) != str(ticket_id)
+            or st.session_state.get("monitor_version") != event_version):
+        with st.spinner("Fetching current status..."):
+            ticket_data = get_ticket_status(ticket_id, zendesk_config)
+            if "ticket" not in ticket_data:
+                st.error(f"Failed to fetch status: {ticket_data.get('error')}")
+                st.stop()
+        st.session_state["monitor_ticket"] = ticket_data["ticket"]
+        st.session_state["monitor_comment"] = get_latest_comment(ticket_id, zendesk_config)
+        st.session_state["monitor_version"] = event_version
+
+    ticket = st.session_state["monitor_ticket"]
+    current_status = ticket.status
 
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Status", current_status.upper())
-    col2.metric("Created", created_at or "N/A")
-    col3.metric("Updated", updated_at or "N/A")
+    col2.metric("Created", ticket.created_display)
+    col3.metric("Updated", ticket.updated_display)
     col4.metric("Ticket", f"#{ticket_id}")
 
-    st.info(f"**Subject:** {subject_display}")
+    st.info(f"**Subject:** {ticket.subject}")
 
     # Auto-apply macro on status change
     if current_status != last_status:
         st.warning(f"🔄 Status changed: {last_status} → {current_status}")
         for key, macro in MACRO_CONFIG.items():
             if current_status == macro["trigger_status"]:
-                with st.spinner(f"Applying macro: {macro['name']}"):
-                    res = update_ticket_with_macro(ticket_id, macro["id"], zendesk_config)
+                # "open" uses the tier macro routed from the ticket's carrier
+                macro_id, macro_name = macro["id"], macro["name"]
+                tier_macro_id = st.session_state.get("tier_macro_id")
+                if key == "open" and tier_macro_id and tier_macro_id != macro_id:
+                    macro_id = tier_macro_id
+                    macro_name = f"{st.session_state.get('tier_macro_carrier')} tier macro #{macro_id}"
+                with st.spinner(f"Applying macro: {macro_name}"):
+                    res = update_ticket_with_macro(ticket_id, macro_id, zendesk_config)
                     if res.get("success"):
-                        st.success(f"✅ Applied macro: {macro['name']}")
-                        st.session_state["last_status"] = res.get("new_status", current_status)
+                        st.success(f"✅ Applied macro: {macro_name}")
+                        st.session_state["last_status"] = res.get("new_status") or current_status
                     else:
                         st.error(f"❌ Macro failed: {res.get('error')}")
 
     # Show latest public comment/email
-    comments = get_ticket_comments(ticket_id, zendesk_config)
-    if comments:
-        last_comment = [c for c in comments if c.get("public", True)][-1]
+    last_comment = st.session_state.get("monitor_comment")
+    if last_comment is not None:
         st.markdown("### 📧 Latest Comment")
-        st.text_area("Latest Message", last_comment.get("body", ""), height=200, disabled=True)
+        st.text_area("Latest Message", last_comment, height=200, disabled=True)
 
-    st.caption(f"Auto-refreshing every {STATUS_POLLING_INTERVAL} seconds...")
+    if webhook_store:
+        st.caption("Live updates via Zendesk webhook...")
+    else:
+        st.caption(f"Auto-refreshing every {STATUS_POLLING_INTERVAL} seconds...")
 
     col1, col2 = st.columns(2)
     if col1.button("🔄 Refresh Now"):
+        st.session_state["monitor_ticket"] = None
         st.rerun()
     if col2.button("⏹ Stop Monitoring"):
         st.session_state.clear()
         st.rerun()
 
-    time.sleep(STATUS_POLLING_INTERVAL)
+    if webhook_store:
+        # Wakes as soon as a ticket event arrives; idle tickets make no API calls
+        webhook_store.wait_for_update(ticket_id, event_version, timeout=STATUS_POLLING_INTERVAL)
+    else:
+        time.sleep(STATUS_POLLING_INTERVAL)
     st.rerun()
\ No newline at end of file
@@ -0,0 +1,336 @@
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Set, Tuple
+
+import requests
+
+from carrier_routing import CarrierRouter
+from circuit_breaker import CircuitOpenError
+from realvalidation import standardize_phone_number, get_phone_providers
+from ticket_export import load_zendesk_secrets, iter_zendesk_tickets
+
+CHECKPOINT_PATH = Path(".mfl_provider_backfill.json")
+# Tickets created while RealValidation was unavailable, one JSON object per line
+ENRICHMENT_QUEUE_PATH = Path(".mfl_enrichment_queue.jsonl")
+
+# Zendesk accepts at most 100 tickets per update_many call
+UPDATE_BATCH_SIZE = 100
+# Pause between bulk update calls and between uncached RealValidation lookups
+UPDATE_DELAY = 2.0
+LOOKUP_DELAY = 0.2
+# Unique numbers looked up (and checkpointed) per batch
+LOOKUP_BATCH_SIZE = 50
+# Numbers RealValidation has no carrier for (e.g. already taken down) are not re-queried for this long
+NO_CARRIER_RETRY_AFTER = 30 * 24 * 3600
+# How often / how long to poll a bulk update's job status
+JOB_POLL_INTERVAL = 2.0
+JOB_TIMEOUT = 600.0
+
+
+# =====================================================
+# CHECKPOINT
+# =====================================================
+
+def load_checkpoint(path: Path = CHECKPOINT_PATH) -> Dict[str, Any]:
+    if not path.exists():
+        return {"providers": {}, "no_carrier": {}, "updated": [], "cursor": None, "missing": {}}
+    with open(path, "r") as f:
+        checkpoint = json.load(f)
+    checkpoint.setdefault("no_carrier", {})
+    checkpoint.setdefault("cursor", None)
+    checkpoint.setdefault("missing", {})
+    return checkpoint
+
+
+def save_checkpoint(checkpoint: Dict[str, Any], path: Path = CHECKPOINT_PATH):
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    tmp_path.replace(path)
+
+
+# =====================================================
+# ENRICHMENT QUEUE
+# =====================================================
+
+def enqueue_enrichment(ticket_id: int, phone_number: str, path: Path = ENRICHMENT_QUEUE_PATH):
+    """Queue a ticket whose provider lookup was skipped, for the next backfill run."""
+    with open(path, "a") as f:
+        f.write(json.dumps({"ticket_id": ticket_id, "phone_number": phone_number}) + "\n")
+
+
+def load_enrichment_queue(path: Path = ENRICHMENT_QUEUE_PATH) -> Dict[str, List[int]]:
+    """Read the queue as standardized number -> ticket ids."""
+    by_number: Dict[str, List[int]] = {}
+    if not path.exists():
+        return by_number
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            try:
+                number = standardize_phone_number(entry["phone_number"])
+            except ValueError:
+                continue
+            by_number.setdefault(number, []).append(int(entry["ticket_id"]))
+    return by_number
+
+
+def save_enrichment_queue(by_number: Dict[str, List[int]], path: Path = ENRICHMENT_QUEUE_PATH):
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        for number, ticket_ids in by_number.items():
+            for ticket_id in ticket_ids:
+                f.write(json.dumps({"ticket_id": ticket_id, "phone_number": number}) + "\n")
+    tmp_path.replace(path)
+
+
+# =====================================================
+# BACKFILL
+# =====================================================
+
+def find_tickets_missing_provider(config: Dict[str, Any], skip_ids: set,
+                                  known: Dict[str, List[int]] | None = None,
+                                  state: Dict[str, Any] | None = None) -> Dict[str, List[int]]:
+    """
+    Scan MFL-form tickets and group those with a phone number but no provider by number.
+
+    Parameters:
+    -----------
+    known : dict or None
+        Tickets found missing a provider by earlier scans and not yet fixed
+    state : dict or None
+        ``{"cursor": ...}`` from the previous scan. Only tickets changed since
+        then are fetched, and ``state["cursor"]`` is advanced as pages are read.
+        Without it every ticket is scanned.
+
+    Returns:
+    --------
+    dict
+        Standardized 10-digit number -> ticket ids that need that number's carrier
+    """
+    cf = config["custom_fields"]
+    phone_fid = str(cf.get("phone_number_field_id", ""))
+    provider_fid = str(cf.get("phone_number_provider_field_id", ""))
+    if not phone_fid or not provider_fid:
+        raise KeyError("phone_number_field_id and phone_number_provider_field_id must be configured")
+
+    by_number: Dict[str, List[int]] = {n: [i for i in ids if i not in skip_ids] for n, ids in (known or {}).items()}
+    number_of = {i: n for n, ids in by_number.items() for i in ids}
+    scanned = 0
+    cursor = state.get("cursor") if state is not None else None
+    for ticket in iter_zendesk_tickets(config, cursor=cursor, state=state, form_id=config["form_id"]):
+        scanned += 1
+        # A changed ticket is re-judged from its current fields
+        if ticket["id"] in number_of:
+            by_number[number_of.pop(ticket["id"])].remove(ticket["id"])
+        # Zendesk rejects updates to closed tickets
+        if ticket["id"] in skip_ids or ticket.get("status") in ("deleted", "closed"):
+            continue
+        values = {str(f.get("id")): f.get("value") for f in ticket.get("custom_fields", []) or []}
+        if values.get(provider_fid) or not values.get(phone_fid):
+            continue
+        try:
+            number = standardize_phone_number(str(values[phone_fid]))
+        except ValueError:
+            continue
+        by_number.setdefault(number, []).append(ticket["id"])
+        number_of[ticket["id"]] = number
+
+    by_number = {n: ids for n, ids in by_number.items() if ids}
+    print(f"[INFO] Scanned {scanned} changed tickets, {sum(map(len, by_number.values()))} missing a provider "
+          f"across {len(by_number)} unique numbers")
+    return by_number
+
+
+def _zendesk_request(method: str, url: str, config: Dict[str, Any], **kwargs) -> requests.Response:
+    """Zendesk API call that waits out rate limiting (429 + Retry-After)."""
+    auth = (f"{config['email']}/token", config["api_token"])
+    while True:
+        resp = requests.request(method, url, auth=auth, timeout=60, **kwargs)
+        if resp.status_code != 429:
+            return resp
+        retry_after = int(resp.headers.get("Retry-After", 60))
+        print(f"[WARN] Rate limited, retrying in {retry_after}s")
+        time.sleep(retry_after)
+
+
+def bulk_update_providers(updates: List[Dict[str, Any]], config: Dict[str, Any]) -> Dict[str, Any]:
+    """Write provider values back with one update_many call (max 100 tickets); returns the queued job."""
+    url = f"https://{config['subdomain']}.zendesk.com/api/v2/tickets/update_many.json"
+    resp = _zendesk_request("PUT", url, config, json={"tickets": updates})
+    if resp.status_code not in (200, 202):
+        raise RuntimeError(f"Bulk update failed {resp.status_code}: {resp.text[:200]}")
+    return resp.json().get("job_status", {})
+
+
+def wait_for_job(job_id: str, config: Dict[str, Any], poll_interval: float = JOB_POLL_INTERVAL,
+                 timeout: float = JOB_TIMEOUT) -> Tuple[Set[int], Dict[int, str]]:
+    """
+    Poll a bulk update job until it finishes.
+
+    Returns:
+    --------
+    tuple
+        (ids Zendesk reports as updated, id -> error for rows it rejected)
+    """
+    url = f"https://{config['subdomain']}.zendesk.com/api/v2/job_statuses/{job_id}.json"
+    deadline = time.monotonic() + timeout
+    while True:
+        resp = _zendesk_request("GET", url, config)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Job status {job_id} failed {resp.status_code}: {resp.text[:200]}")
+        job = resp.json().get("job_status", {})
+        if job.get("status") in ("completed", "failed", "killed"):
+            break
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Bulk update job {job_id} still '{job.get('status')}' after {timeout:.0f}s")
+        time.sleep(poll_interval)
+
+    succeeded: Set[int] = set()
+    failed: Dict[int, str] = {}
+    for result in job.get("results") or []:
+        if result.get("success") or result.get("status") == "Updated":
+            succeeded.add(result.get("id"))
+        else:
+            failed[result.get("id")] = result.get("details") or result.get("error") or "unknown error"
+    if job.get("status") != "completed":
+        print(f"[WARN] Bulk update job {job_id} ended '{job.get('status')}': {job.get('message', '')}")
+    return succeeded, failed
+
+
+def backfill_providers(dry_run: bool = False, checkpoint_path: Path = CHECKPOINT_PATH,
+                       update_delay: float = UPDATE_DELAY, lookup_delay: float = LOOKUP_DELAY,
+                       queue_only: bool = False, full_scan: bool = False) -> int:
+    """
+    Fill in ``phone_number_provider`` for tickets created without one.
+
+    Unique numbers are looked up in batches, and both carriers and "no
+    carrier" answers are checkpointed so later runs do not re-query them
+    (the latter only until ``NO_CARRIER_RETRY_AFTER``). After every bulk
+    update the job is polled and only tickets Zendesk reports as updated
+    are checkpointed, so an interrupted run resumes without repeating
+    updates. The ticket scan resumes from the export cursor saved in the
+    checkpoint, so a run only fetches tickets changed since the last one;
+    tickets still missing a provider (lookup failed, no carrier yet, or
+    rejected by Zendesk) are carried in the checkpoint until they are fixed.
+    ``full_scan`` discards both and re-scans every MFL ticket. With
+    ``queue_only`` the ticket scan is skipped and only the enrichment queue
+    is processed. Returns the number of tickets updated.
+    """
+    config = load_zendesk_secrets()
+    provider_fid = int(config["custom_fields"]["phone_number_provider_field_id"])
+    router = CarrierRouter(config.get("phone_provider_mapping", {}))
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    providers: Dict[str, str] = checkpoint["providers"]
+    # Number -> epoch seconds after which a "no carrier" answer may be re-checked
+    no_carrier: Dict[str, float] = checkpoint["no_carrier"]
+    updated = set(checkpoint["updated"])
+
+    if queue_only:
+        queued = load_enrichment_queue()
+        by_number = {n: [i for i in ids if i not in updated] for n, ids in queued.items()}
+    else:
+        scan_state = {"cursor": None if full_scan else checkpoint["cursor"]}
+        by_number = find_tickets_missing_provider(config, updated, {} if full_scan else checkpoint["missing"],
+                                                  scan_state)
+        # Saved together, so the tickets the cursor has moved past are never lost
+        checkpoint["cursor"] = scan_state["cursor"]
+        checkpoint["missing"] = by_number
+        save_checkpoint(checkpoint, checkpoint_path)
+
+    pending: List[Dict[str, Any]] = []
+    written = 0
+    rejected: Set[int] = set()
+
+    def flush():
+        nonlocal pending, written
+        if not pending:
+            return
+        if not dry_run:
+            job = bulk_update_providers(pending, config)
+            succeeded, failed = wait_for_job(job["id"], config)
+            for ticket_id, error in failed.items():
+                print(f"[WARN] Ticket {ticket_id} not updated: {error}")
+            rejected.update(failed)
+            print(f"[INFO] Updated {len(succeeded)}/{len(pending)} tickets (job {job['id']})")
+            updated.update(succeeded)
+            checkpoint["updated"] = sorted(updated)
+            save_checkpoint(checkpoint, checkpoint_path)
+            written += len(succeeded)
+            time.sleep(update_delay)
+        else:
+            print(f"[DRY RUN] Would update {len(pending)} tickets")
+            written += len(pending)
+        pending = []
+
+    now = time.time()
+    to_lookup = [n for n in by_number if n not in providers and no_carrier.get(n, 0) <= now]
+    try:
+        for start in range(0, len(to_lookup), LOOKUP_BATCH_SIZE):
+            batch = to_lookup[start:start + LOOKUP_BATCH_SIZE]
+            for number, carrier in get_phone_providers(batch, delay=lookup_delay).items():
+                if carrier:
+                    providers[number] = router.route(carrier).carrier
+                    no_carrier.pop(number, None)
+                elif carrier == "":
+                    no_carrier[number] = now + NO_CARRIER_RETRY_AFTER
+            save_checkpoint(checkpoint, checkpoint_path)
+    except CircuitOpenError as e:
+        print(f"[WARN] Stopping lookups early: {e}")
+
+    for number, ticket_ids in by_number.items():
+        if not providers.get(number):
+            continue
+        for ticket_id in ticket_ids:
+            pending.append({"id": ticket_id, "custom_fields": [{"id": provider_fid, "value": providers[number]}]})
+            if len(pending) >= UPDATE_BATCH_SIZE:
+                flush()
+    flush()
+
+    remaining = {n: ids for n, ids in by_number.items() if ids and not providers.get(n)}
+    missing = sum(len(ids) for ids in remaining.values())
+    if not queue_only and not dry_run:
+        unfixed = {n: [i for i in ids if i not in updated] for n, ids in by_number.items()}
+        checkpoint["missing"] = {n: ids for n, ids in unfixed.items() if ids}
+        save_checkpoint(checkpoint, checkpoint_path)
+    if queue_only and not dry_run:
+        # Numbers with no carrier on record are not worth keeping queued
+        remaining = {n: ids for n, ids in remaining.items() if n not in no_carrier}
+        # Resolved but not yet written (interrupted); rows Zendesk rejected are dropped
+        for number, ticket_ids in by_number.items():
+            unwritten = [i for i in ticket_ids if i not in updated and i not in rejected]
+            if providers.get(number) and unwritten:
+                remaining[number] = unwritten
+        # Keep entries the app queued while this run was in progress
+        for number, ticket_ids in load_enrichment_queue().items():
+            queued_later = [i for i in ticket_ids if i not in queued.get(number, [])]
+            if queued_later:
+                remaining.setdefault(number, []).extend(queued_later)
+        save_enrichment_queue(remaining)
+    if missing:
+        print(f"[WARN] {missing} tickets still have no provider (lookup failed or no carrier on record)")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill phone number provider on existing MFL tickets")
+    parser.add_argument("--dry-run", action="store_true", help="Look up carriers but do not update tickets")
+    parser.add_argument("--queue-only", action="store_true",
+                        help="Only process tickets queued while RealValidation was unavailable")
+    parser.add_argument("--full-scan", action="store_true",
+                        help="Ignore the saved scan cursor and re-scan every MFL ticket")
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH)
+    parser.add_argument("--update-delay", type=float, default=UPDATE_DELAY,
+                        help="Seconds between Zendesk bulk update calls")
+    parser.add_argument("--lookup-delay", type=float, default=LOOKUP_DELAY,
+                        help="Seconds between RealValidation lookups")
+    args = parser.parse_args()
+
+    count = backfill_providers(args.dry_run, args.checkpoint, args.update_delay, args.lookup_delay,
+                               args.queue_only, args.full_scan)
+    print(f"Updated {count} tickets")
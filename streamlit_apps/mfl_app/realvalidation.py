@@ -1,79 +1,177 @@
 import re
+import time
 import requests
 import tomli
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict
 
+from circuit_breaker import CircuitOpenError, get_breaker
 
-def get_phone_provider(phonenumber):
-    """
-    Standardizes a phone number to 10 digits and retrieves the carrier/provider information.
 
-    Parameters:
-    -----------
-    phonenumber : str
-        A US phone number in any format (e.g., "(727) 555-5555", "727-555-5555", "7275555555")
+API_URL = "https://api.realvalidation.com/rpvWebService/TurboV3.php"
+SECRETS_PATH = Path(".streamlit/secrets.toml")
 
-    Returns:
-    --------
-    str or None
-        The carrier/provider name if successful, None if there's an error
+# Trip after 3 consecutive errors or lookups slower than 3s; probe again after a minute
+BREAKER_SETTINGS = {"failure_threshold": 3, "latency_slo": 3.0, "reset_timeout": 60.0}
+
+# Standardized number -> carrier, for successful lookups only
+_carrier_cache: Dict[str, str] = {}
+_session = requests.Session()
+
+
+def standardize_phone_number(phonenumber):
     """
+    Standardizes a US phone number to 10 digits.
 
-    # Step 1: Standardize phone number to 10 digits
+    Raises ValueError if the number does not have 10 digits (or 11 with a leading '1').
+    """
     # Remove all non-digit characters
     digits_only = re.sub(r'\D', '', phonenumber)
 
     # Handle different formats
     if len(digits_only) == 11 and digits_only[0] == '1':
         # Remove leading '1' for US numbers
-        standardized_phone = digits_only[1:]
+        return digits_only[1:]
     elif len(digits_only) == 10:
-        standardized_phone = digits_only
+        return digits_only
     else:
         raise ValueError(f"Invalid phone number format. Expected 10 or 11 digits, got {len(digits_only)}")
 
-    # Step 2: Load API token from secrets.toml
-    secrets_path = Path(".streamlit/secrets.toml")
 
+@lru_cache(maxsize=1)
+def load_api_token():
+    """Load the RealValidation API token from secrets.toml (read once per process)."""
     try:
-        with open(secrets_path, "rb") as f:
+        with open(SECRETS_PATH, "rb") as f:
             secrets = tomli.load(f)
-            api_token = secrets["rv_api_token"]
+            return secrets["rv_api_token"]
     except FileNotFoundError:
         raise FileNotFoundError("Could not find .streamlit/secrets.toml file")
     except KeyError:
         raise KeyError("'rv_api_token' not found in secrets.toml")
 
-    # Step 3: Call the API
-    api_url = "https://api.realvalidation.com/rpvWebService/TurboV3.php"
+
+def _lookup_carrier(standardized_phone):
+    """
+    Call the RealValidation API for a standardized number, using the process-wide cache.
+
+    Returns the carrier, "" when RealValidation answered without one (e.g. a
+    disconnected number), or None when the call itself failed. Raises
+    CircuitOpenError without calling the API while RealValidation is marked down.
+    """
+    if standardized_phone in _carrier_cache:
+        return _carrier_cache[standardized_phone]
+
+    # Load the token first so a missing secret never leaves a half-open probe unsettled
+    api_token = load_api_token()
+    breaker = get_breaker("realvalidation", **BREAKER_SETTINGS)
+    if not breaker.allow():
+        raise CircuitOpenError("RealValidation is unavailable (circuit open)")
+
     params = {
         "output": "json",
         "phone": standardized_phone,
         "token": api_token
     }
 
+    start = time.monotonic()
     try:
-        response = requests.get(api_url, params=params, timeout=10)
+        response = _session.get(API_URL, params=params, timeout=10)
         response.raise_for_status()
 
-        # Step 4: Extract carrier information
+        # Extract carrier information
         data = response.json()
-
-        # Check if the call was successful
-        if data.get("status") == "connected":
-            carrier = data.get("carrier")
-            return carrier
-        else:
-            error_text = data.get("error_text", "Unknown error")
-            print(f"API returned status '{data.get('status')}': {error_text}")
-            return None
-
     except requests.exceptions.RequestException as e:
+        breaker.record_failure()
         print(f"Error calling API: {e}")
         return None
     except ValueError as e:
+        breaker.record_failure()
         print(f"Error parsing JSON response: {e}")
         return None
+    except BaseException:
+        breaker.record_failure()
+        raise
+    breaker.record_success(time.monotonic() - start)
+
+    # Check if the call was successful
+    if data.get("status") == "connected":
+        carrier = data.get("carrier")
+        if carrier:
+            _carrier_cache[standardized_phone] = carrier
+        return carrier or ""
+    else:
+        error_text = data.get("error_text", "Unknown error")
+        print(f"API returned status '{data.get('status')}': {error_text}")
+        return ""
+
+
+def get_phone_provider(phonenumber):
+    """
+    Standardizes a phone number to 10 digits and retrieves the carrier/provider information.
+
+    Parameters:
+    -----------
+    phonenumber : str
+        A US phone number in any format (e.g., "(727) 555-5555", "727-555-5555", "7275555555")
+
+    Returns:
+    --------
+    str or None
+        The carrier/provider name if successful, None if there's an error
+    """
+    return _lookup_carrier(standardize_phone_number(phonenumber)) or None
+
+
+def lookup_phone_provider(phonenumber):
+    """
+    Like get_phone_provider, but tells a failed lookup apart from a number without a carrier.
+
+    Returns:
+    --------
+    str or None
+        The carrier name, "" when RealValidation has no carrier for the number,
+        or None when the lookup failed and is worth retrying later
+
+    Raises ValueError for an invalid number and CircuitOpenError while
+    RealValidation is marked down.
+    """
+    return _lookup_carrier(standardize_phone_number(phonenumber))
+
+
+def get_phone_providers(phonenumbers, delay=0.0):
+    """
+    Looks up carriers for many phone numbers, calling the API once per unique number.
+
+    Parameters:
+    -----------
+    phonenumbers : iterable of str
+        US phone numbers in any format. Invalid numbers are skipped.
+    delay : float
+        Seconds to sleep between uncached API calls, to stay under the RealValidation rate limit
+
+    Returns:
+    --------
+    dict
+        Standardized 10-digit number -> carrier name, "" where RealValidation has no
+        carrier for the number, None where the lookup failed
+
+    Raises CircuitOpenError if RealValidation goes down part-way through.
+    """
+    results = {}
+    for phonenumber in phonenumbers:
+        try:
+            standardized_phone = standardize_phone_number(phonenumber)
+        except ValueError:
+            continue
+        if standardized_phone in results:
+            continue
+        cached = standardized_phone in _carrier_cache
+        results[standardized_phone] = _lookup_carrier(standardized_phone)
+        if delay and not cached:
+            time.sleep(delay)
+    return results
 
 if __name__ == "__main__":
     provider = get_phone_provider("510-320-7168") #AT&T
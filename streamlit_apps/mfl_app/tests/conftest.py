@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The app modules use flat imports (``from circuit_breaker import ...``), as under ``streamlit run``
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("requests")
+pytest.importorskip("tomli")
+
+from campaign_clusters import CampaignIndex  # noqa: E402
+from carrier_routing import CarrierRouter  # noqa: E402
+
+DESCRIPTION = "Your package is held at customs, pay the release fee at hxxp://parcel-fee.example today"
+
+
+def test_verbatim_carrier_matches_canonical_query():
+    index = CampaignIndex(CarrierRouter())
+    index.add({"id": 1, "status": "open", "phone_number": "2025550101",
+               "phone_number_provider": "new cingular wireless pcs, llc", "description": DESCRIPTION})
+
+    related = index.related(phone_number="2025550150", carrier="AT&T", description=DESCRIPTION)
+    assert [r["id"] for r in related] == ["1"]
+    assert "same carrier" in related[0]["reasons"]
+
+
+def test_clusters_join_block_across_carrier_spellings():
+    index = CampaignIndex(CarrierRouter())
+    index.add({"id": 1, "status": "open", "phone_number": "2025550101", "phone_number_provider": "Cellco Partnership"})
+    index.add({"id": 2, "status": "open", "phone_number": "2025550199", "phone_number_provider": "Verizon"})
+    assert [sorted(g) for g in index.clusters()] == [["1", "2"]]
@@ -0,0 +1,29 @@
+from carrier_routing import CarrierRouter
+
+
+def test_unknown_mapping_key_gets_its_own_route():
+    router = CarrierRouter({"Peerless Network": "Peerless"}, default_macro_id=7)
+    route = router.route("Peerless Network, Inc.")
+    assert route.carrier == "Peerless Network"
+    assert route.escalate_to == "Peerless"
+    assert route.macro_id == 7
+
+
+def test_misspelled_mapping_key_resolves_to_known_carrier():
+    router = CarrierRouter({"Verizn Wireles": {"escalate_to": "Verizon", "macro_id": 1}})
+    route = router.route("Cellco Partnership dba Verizon Wireless")
+    assert route.carrier == "Verizon"
+    assert route.escalate_to == "Verizon"
+    assert route.macro_id == 1
+
+
+def test_noise_words_match_with_or_without_spaces():
+    router = CarrierRouter()
+    assert router.normalize("Metro PCS") == router.normalize("MetroPCS") == "T-Mobile"
+    assert router.normalize("New Cingular Wireless PCS, LLC") == "AT&T"
+
+
+def test_embedded_brand_must_be_whole_words():
+    router = CarrierRouter()
+    assert router.normalize("Sprintfield Telecom") is None
+    assert router.normalize("Sprint Spectrum L.P.") == "T-Mobile"
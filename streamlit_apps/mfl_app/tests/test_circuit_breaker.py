@@ -0,0 +1,79 @@
+import time
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker
+
+
+def make_breaker(**kwargs):
+    settings = {"failure_threshold": 2, "latency_slo": 1.0, "reset_timeout": 0.05}
+    settings.update(kwargs)
+    return CircuitBreaker("test", **settings)
+
+
+def wait_for_reset(breaker):
+    time.sleep(breaker.reset_timeout + 0.01)
+
+
+def test_opens_after_consecutive_failures():
+    breaker = make_breaker()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count():
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_slow_call_counts_as_failure():
+    breaker = make_breaker()
+    breaker.record_success(5.0)
+    breaker.record_success(5.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_allows_single_probe():
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    wait_for_reset(breaker)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes():
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    wait_for_reset(breaker)
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_and_probes_again():
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    wait_for_reset(breaker)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    # The failed probe must not wedge the breaker: the next window probes again
+    wait_for_reset(breaker)
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_get_breaker_is_shared_per_name():
+    assert get_breaker("shared-test", failure_threshold=5) is get_breaker("shared-test")
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("tomli")
+
+import requests  # noqa: E402
+
+import circuit_breaker  # noqa: E402
+import realvalidation  # noqa: E402
+from circuit_breaker import HALF_OPEN, OPEN  # noqa: E402
+
+PHONE = "5103207168"
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """A fresh, tripped RealValidation breaker whose reset timeout has just passed."""
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    monkeypatch.setitem(realvalidation.BREAKER_SETTINGS, "reset_timeout", 0.05)
+    monkeypatch.setattr(realvalidation, "_carrier_cache", {})
+    monkeypatch.setattr(realvalidation, "load_api_token", lambda: "token")
+    breaker = circuit_breaker.get_breaker("realvalidation", **realvalidation.BREAKER_SETTINGS)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    time.sleep(breaker.reset_timeout + 0.01)
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def test_raising_probe_is_settled(breaker, monkeypatch):
+    def get(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(realvalidation._session, "get", get)
+    with pytest.raises(KeyboardInterrupt):
+        realvalidation._lookup_carrier(PHONE)
+
+    assert breaker.state == OPEN
+    time.sleep(breaker.reset_timeout + 0.01)
+    assert breaker.allow()
+
+
+def test_missing_token_does_not_consume_probe(breaker, monkeypatch):
+    def missing_token():
+        raise KeyError("'rv_api_token' not found in secrets.toml")
+
+    monkeypatch.setattr(realvalidation, "load_api_token", missing_token)
+    with pytest.raises(KeyError):
+        realvalidation._lookup_carrier(PHONE)
+
+    assert breaker.allow()
+
+
+def test_failed_call_returns_none_and_no_carrier_returns_empty(breaker, monkeypatch):
+    def failing_get(*args, **kwargs):
+        raise requests.exceptions.ConnectionError("down")
+
+    monkeypatch.setattr(realvalidation._session, "get", failing_get)
+    assert realvalidation._lookup_carrier(PHONE) is None
+
+    time.sleep(breaker.reset_timeout + 0.01)
+    monkeypatch.setattr(realvalidation._session, "get",
+                        lambda *args, **kwargs: FakeResponse({"status": "disconnected"}))
+    assert realvalidation.lookup_phone_provider(PHONE) == ""
+    assert realvalidation.get_phone_provider(PHONE) is None
@@ -0,0 +1,356 @@
+import argparse
+import csv
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterator, List
+
+import requests
+import tomli
+
+# Parquet output is optional; CSV export works without pyarrow installed.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+MIDDLEWARE_URL = "http://localhost:8000"  # Adjust for your setup
+SECRETS_PATH = Path(".streamlit/secrets.toml")
+EXPORT_STATE_PATH = Path(".mfl_export_state.json")
+
+ROW_GROUP_SIZE = 1000
+MIDDLEWARE_PAGE_SIZE = 100
+
+# Columns written to every export, in order
+EXPORT_COLUMNS = [
+    "ticket_id",
+    "subject",
+    "status",
+    "created_at",
+    "updated_at",
+    "client",
+    "phone_number",
+    "phone_number_provider",
+    "attack_vector",
+    "call_to_action",
+    "sources",
+    "resolution",
+    "escalate_to",
+    "description",
+]
+
+
+# =====================================================
+# CONFIGURATION
+# =====================================================
+
+def load_zendesk_secrets(secrets_path: Path = SECRETS_PATH) -> Dict[str, Any]:
+    """Load the [zendesk] table from .streamlit/secrets.toml outside of Streamlit."""
+    try:
+        with open(secrets_path, "rb") as f:
+            secrets = tomli.load(f)
+            z = secrets["zendesk"]
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Could not find {secrets_path} file")
+    except KeyError:
+        raise KeyError("'zendesk' section not found in secrets.toml")
+
+    custom_fields = {k: v for k, v in z.get("custom_fields", {}).items() if v}
+    return {
+        "subdomain": z["subdomain"],
+        "email": z["email"],
+        "api_token": z["api_token"],
+        "form_id": z.get("form_id"),
+        "custom_fields": custom_fields,
+        "phone_provider_mapping": z.get("phone_provider_mapping", {}),
+    }
+
+
+def field_columns(config: Dict[str, Any]) -> Dict[str, str]:
+    """Map Zendesk custom field id -> export column (``client_field_id`` -> ``client``)."""
+    columns = {}
+    for key, fid in config.get("custom_fields", {}).items():
+        if key.endswith("_field_id"):
+            columns[str(fid)] = key[: -len("_field_id")]
+    return columns
+
+
+def load_export_state(state_path: Path = EXPORT_STATE_PATH) -> Dict[str, Any]:
+    if not state_path.exists():
+        return {}
+    with open(state_path, "r") as f:
+        return json.load(f)
+
+
+def save_export_state(state: Dict[str, Any], state_path: Path = EXPORT_STATE_PATH):
+    tmp_path = state_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    tmp_path.replace(state_path)
+
+
+# =====================================================
+# TICKET SOURCES
+# =====================================================
+
+def _get_with_retry(url: str, **kwargs) -> requests.Response:
+    """GET that waits out Zendesk/middleware rate limiting (429 + Retry-After)."""
+    while True:
+        resp = requests.get(url, timeout=60, **kwargs)
+        if resp.status_code != 429:
+            return resp
+        retry_after = int(resp.headers.get("Retry-After", 60))
+        print(f"[WARN] Rate limited, retrying in {retry_after}s")
+        time.sleep(retry_after)
+
+
+def iter_zendesk_tickets(config: Dict[str, Any], start_time: int = 0, cursor: str | None = None,
+                         state: Dict[str, Any] | None = None, form_id: int | str | None = None
+                         ) -> Iterator[Dict[str, Any]]:
+    """
+    Stream every ticket through the Zendesk cursor-based incremental export.
+
+    Only one page (up to 1000 tickets) is held in memory at a time. When
+    ``state`` is given, ``state["cursor"]`` is updated after each page so the
+    next run can resume where this one stopped. With ``form_id``, tickets
+    from other forms are skipped; the export itself cannot filter by form,
+    so the cursor still advances past them.
+    """
+    base = f"https://{config['subdomain']}.zendesk.com/api/v2/incremental/tickets/cursor.json"
+    auth = (f"{config['email']}/token", config["api_token"])
+    params = {"cursor": cursor} if cursor else {"start_time": start_time}
+
+    while True:
+        resp = _get_with_retry(base, params=params, auth=auth)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Zendesk export failed {resp.status_code}: {resp.text[:200]}")
+
+        page = resp.json()
+        for ticket in page.get("tickets", []):
+            if form_id and str(ticket.get("ticket_form_id")) != str(form_id):
+                continue
+            yield ticket
+
+        if page.get("after_cursor") and state is not None:
+            state["cursor"] = page["after_cursor"]
+        if page.get("end_of_stream") or not page.get("after_cursor"):
+            return
+        params = {"cursor": page["after_cursor"]}
+
+
+def iter_middleware_tickets(page_size: int = MIDDLEWARE_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """Stream every ticket by walking the middleware /mfl/tickets pages."""
+    page = 1
+    while True:
+        resp = _get_with_retry(f"{MIDDLEWARE_URL}/mfl/tickets", params={"page": page, "page_size": page_size})
+        if resp.status_code != 200:
+            raise RuntimeError(f"Middleware export failed {resp.status_code}: {resp.text[:200]}")
+
+        data = resp.json()
+        tickets = data.get("tickets", [])
+        for ticket in tickets:
+            yield ticket
+
+        if not tickets or page * page_size >= data.get("total", 0):
+            return
+        page += 1
+
+
+def flatten_ticket(ticket: Dict[str, Any], columns: Dict[str, str]) -> Dict[str, Any]:
+    """Reduce a Zendesk or middleware ticket to a flat export row."""
+    row = {col: None for col in EXPORT_COLUMNS}
+    row["ticket_id"] = ticket.get("id")
+    for key in ("subject", "status", "created_at", "updated_at", "description"):
+        row[key] = ticket.get(key)
+
+    # Middleware tickets already carry logical field names
+    for key in EXPORT_COLUMNS:
+        if row[key] is None and ticket.get(key) is not None:
+            row[key] = ticket[key]
+
+    # Zendesk tickets carry a custom_fields list of {id, value}
+    for field in ticket.get("custom_fields", []) or []:
+        col = columns.get(str(field.get("id")))
+        if col in row and field.get("value") not in (None, ""):
+            row[col] = field["value"]
+
+    for key, value in row.items():
+        if value is not None and key != "ticket_id":
+            row[key] = value if isinstance(value, str) else json.dumps(value)
+    return row
+
+
+# =====================================================
+# OUTPUT SINKS
+# =====================================================
+
+class CsvSink:
+    """
+    Write rows to a CSV file; in append mode the header is only written for a new file.
+
+    An appended file is a change log: a ticket updated again since an
+    earlier run gets another row, and the last row for a ``ticket_id`` is
+    its current state (``LocalDuplicateIndex`` and ``CampaignIndex`` read it
+    that way).
+    """
+
+    def __init__(self, path: Path, append: bool = False):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_header = not append or not path.exists() or path.stat().st_size == 0
+        self._file = open(path, "a" if append else "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=EXPORT_COLUMNS)
+        if write_header:
+            self._writer.writeheader()
+
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """
+    Write rows to a Parquet file, one row group per batch.
+
+    Parquet files cannot be appended to, so incremental runs write a new
+    part file into the output directory (readable together as one dataset).
+    """
+
+    def __init__(self, directory: Path):
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow is required for Parquet export (pip install pyarrow)")
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.path = directory / f"tickets-{stamp}.parquet"
+        self._schema = pa.schema(
+            [pa.field("ticket_id", pa.int64())] + [pa.field(c, pa.string()) for c in EXPORT_COLUMNS[1:]]
+        )
+        self._writer = None
+
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(str(self.path), self._schema)
+        table = pa.Table.from_pylist(rows, schema=self._schema)
+        self._writer.write_table(table, row_group_size=len(rows))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+# =====================================================
+# EXPORT
+# =====================================================
+
+def export_tickets(output: Path, fmt: str = "csv", source: str = "zendesk", incremental: bool = False,
+                   row_group_size: int = ROW_GROUP_SIZE, state_path: Path = EXPORT_STATE_PATH) -> int:
+    """
+    Stream the full MFL ticket history to CSV and/or Parquet with constant memory.
+
+    Zendesk exports keep only tickets on the MFL form (``form_id`` in secrets).
+
+    Parameters:
+    -----------
+    output : Path
+        CSV file path, or directory for Parquet part files. With ``fmt="both"``
+        the CSV is written to ``output/tickets.csv`` next to the Parquet parts.
+    fmt : str
+        "csv", "parquet" or "both"
+    source : str
+        "zendesk" (cursor-based incremental export) or "middleware" (paged /mfl/tickets)
+    incremental : bool
+        Export only tickets updated since the last recorded run. The CSV is
+        appended to, so it holds one row per ticket change and the latest
+        row per ``ticket_id`` wins.
+
+    Returns:
+    --------
+    int
+        Number of tickets written
+    """
+    config = load_zendesk_secrets() if source == "zendesk" else {}
+    columns = field_columns(config)
+    state = load_export_state(state_path) if incremental else {}
+    if state.get("source") not in (None, source):
+        print(f"[WARN] Export state was recorded for '{state['source']}', starting a full export")
+        state = {}
+
+    sinks = []
+    if fmt in ("csv", "both"):
+        sinks.append(CsvSink(output / "tickets.csv" if fmt == "both" else output, append=incremental))
+    if fmt in ("parquet", "both"):
+        sinks.append(ParquetSink(output))
+
+    if source == "zendesk":
+        tickets = iter_zendesk_tickets(config, cursor=state.get("cursor"), state=state, form_id=config["form_id"])
+    else:
+        tickets = iter_middleware_tickets()
+    # The middleware cannot filter by update time, so incremental runs skip older rows here
+    since = state.get("updated_since") if source == "middleware" else None
+
+    written = 0
+    max_updated = state.get("updated_since") or ""
+    # Cursor as of the last flush; iter_zendesk_tickets advances state["cursor"] once a page is consumed
+    flushed_cursor = state.get("cursor")
+    batch: List[Dict[str, Any]] = []
+
+    def checkpoint():
+        state["source"] = source
+        state["updated_since"] = max_updated
+        state["last_run"] = datetime.now(timezone.utc).isoformat()
+        save_export_state(state, state_path)
+
+    try:
+        for ticket in tickets:
+            # Flush only on a Zendesk page boundary: every buffered row then comes from a page
+            # the saved cursor is past, so a retry resumes after them instead of re-writing them.
+            # Middleware pages have no resumable cursor and are checkpointed at the end only.
+            if source == "zendesk" and len(batch) >= row_group_size and state.get("cursor") != flushed_cursor:
+                for sink in sinks:
+                    sink.write_rows(batch)
+                written += len(batch)
+                batch = []
+                flushed_cursor = state["cursor"]
+                checkpoint()
+
+            row = flatten_ticket(ticket, columns)
+            if since and (row["updated_at"] or "") <= since:
+                continue
+            batch.append(row)
+            max_updated = max(max_updated, row["updated_at"] or "")
+            if source != "zendesk" and len(batch) >= row_group_size:
+                for sink in sinks:
+                    sink.write_rows(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            for sink in sinks:
+                sink.write_rows(batch)
+            written += len(batch)
+    finally:
+        for sink in sinks:
+            sink.close()
+
+    checkpoint()
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the MFL ticket history to CSV/Parquet")
+    parser.add_argument("output", type=Path, help="CSV file, or output directory for Parquet")
+    parser.add_argument("--format", dest="fmt", choices=["csv", "parquet", "both"], default="csv")
+    parser.add_argument("--source", choices=["zendesk", "middleware"], default="zendesk")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only export tickets updated since the last run. CSV output is appended "
+                             "as a change log: the latest row per ticket_id is the current state")
+    parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE)
+    args = parser.parse_args()
+
+    count = export_tickets(args.output, args.fmt, args.source, args.incremental, args.row_group_size)
+    print(f"Exported {count} tickets to {args.output}")
@@ -0,0 +1,113 @@
+import sys
+from datetime import datetime
+from typing import Dict, Any, List
+
+# orjson decodes API responses several times faster; fall back to the stdlib if it is not installed
+try:
+    import orjson
+
+    def loads(data):
+        return orjson.loads(data)
+except ImportError:
+    import json
+
+    def loads(data):
+        return json.loads(data)
+
+DISPLAY_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    """Parse a Zendesk ISO-8601 timestamp ("2024-01-01T12:00:00Z"); None if missing or malformed."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TicketRecord:
+    """
+    Compact ticket holding only the fields the app uses.
+
+    Built once from a Zendesk or middleware ticket payload: timestamps are
+    parsed up front and status strings are interned, so watched tickets and
+    the local mirror share one copy of "open"/"solved" instead of a full
+    nested JSON dict per ticket.
+    """
+
+    __slots__ = ("id", "status", "subject", "phone_number", "url", "created_at", "updated_at")
+
+    def __init__(self, id: int, status: str = "unknown", subject: str = "N/A", phone_number: str | None = None,
+                 url: str | None = None, created_at: datetime | None = None, updated_at: datetime | None = None):
+        self.id = id
+        self.status = sys.intern(status or "unknown")
+        self.subject = subject or "N/A"
+        self.phone_number = phone_number
+        self.url = url
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_api(cls, ticket: Dict[str, Any], phone_fid: str | None = None) -> "TicketRecord":
+        """
+        Build a record from a ticket dict.
+
+        ``phone_fid`` reads the phone number from a Zendesk ``custom_fields``
+        list; middleware tickets already carry ``phone_number``.
+        """
+        phone_number = ticket.get("phone_number")
+        if phone_number is None and phone_fid:
+            for field in ticket.get("custom_fields", []) or []:
+                if str(field.get("id")) == phone_fid:
+                    phone_number = field.get("value")
+                    break
+        ticket_id = ticket.get("id")
+        return cls(
+            id=int(ticket_id) if str(ticket_id).isdigit() else ticket_id,
+            status=ticket.get("status"),
+            subject=ticket.get("subject"),
+            phone_number=phone_number,
+            url=ticket.get("url"),
+            created_at=parse_timestamp(ticket.get("created_at")),
+            updated_at=parse_timestamp(ticket.get("updated_at")),
+        )
+
+    @classmethod
+    def decode(cls, body: bytes, phone_fid: str | None = None) -> "TicketRecord":
+        """Decode a ``GET /api/v2/tickets/{id}.json`` response body."""
+        return cls.from_api(loads(body)["ticket"], phone_fid)
+
+    @staticmethod
+    def format_time(value: datetime | None) -> str:
+        return value.strftime(DISPLAY_FORMAT) if value else "N/A"
+
+    @property
+    def created_display(self) -> str:
+        return self.format_time(self.created_at)
+
+    @property
+    def updated_display(self) -> str:
+        return self.format_time(self.updated_at)
+
+    def summary(self) -> Dict[str, Any]:
+        """Dict in the shape of the middleware duplicate-check ``tickets`` entries."""
+        return {
+            "id": self.id,
+            "status": self.status,
+            "subject": self.subject,
+            "created_at": self.created_at.isoformat() if self.created_at else "N/A",
+        }
+
+    def __repr__(self):
+        return f"TicketRecord(id={self.id!r}, status={self.status!r})"
+
+
+def latest_public_comment(body: bytes) -> str | None:
+    """Body of the newest public comment in a ``comments.json`` response, without keeping the list."""
+    comments: List[Dict[str, Any]] = loads(body).get("comments", [])
+    for comment in reversed(comments):
+        if comment.get("public", True):
+            return comment.get("body", "")
+    return None
@@ -0,0 +1,186 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any
+
+WEBHOOK_PATH = "/zendesk/webhook"
+# Reject signed requests older than this (replay protection)
+MAX_SIGNATURE_AGE = 300
+# Events arriving within this window of each other are delivered as one update
+COALESCE_WINDOW = 0.25
+SEEN_EVENT_LIMIT = 10000
+# Ticket event payloads are a few KB; anything larger is refused unread
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def verify_signature(secret: str, body: bytes, signature: str, timestamp: str) -> bool:
+    """Check Zendesk's X-Zendesk-Webhook-Signature: base64(HMAC-SHA256(secret, timestamp + body))."""
+    if not signature or not timestamp:
+        return False
+    digest = hmac.new(secret.encode(), timestamp.encode() + body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), signature)
+
+
+def parse_ticket_event(payload: Dict[str, Any]) -> Dict[str, Any] | None:
+    """
+    Extract ticket id, status and update time from a webhook payload.
+
+    Accepts Zendesk event-subscription payloads (``detail``/``event`` blocks)
+    and trigger-based webhooks with a flat ``ticket_id``/``status`` body.
+    """
+    if not isinstance(payload, dict):
+        return None
+    detail = payload.get("detail") or {}
+    event = payload.get("event") or {}
+    ticket_id = detail.get("id") or payload.get("ticket_id")
+    if not ticket_id:
+        return None
+
+    status = payload.get("status") or detail.get("status")
+    if (payload.get("type") or "").endswith("ticket.status_changed") and event.get("current"):
+        status = event["current"]
+
+    return {
+        "event_id": payload.get("id") or payload.get("event_id"),
+        "ticket_id": str(ticket_id),
+        "status": status.lower() if status else None,
+        "updated_at": detail.get("updated_at") or payload.get("updated_at") or payload.get("time") or "",
+    }
+
+
+class TicketEventStore:
+    """
+    Latest known state per ticket, fed by the webhook receiver.
+
+    Duplicate deliveries (same event id) and out-of-order events are dropped,
+    and bursts for a ticket collapse into its latest state. Each accepted
+    change bumps the ticket's ``version`` and wakes anyone waiting on it.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._tickets: Dict[str, Dict[str, Any]] = {}
+        self._seen: OrderedDict = OrderedDict()
+
+    def publish(self, event: Dict[str, Any]) -> bool:
+        """Record an event; returns False if it was a duplicate or stale."""
+        with self._cond:
+            event_id = event.get("event_id")
+            if event_id:
+                if event_id in self._seen:
+                    return False
+                self._seen[event_id] = None
+                if len(self._seen) > SEEN_EVENT_LIMIT:
+                    self._seen.popitem(last=False)
+
+            current = self._tickets.get(event["ticket_id"])
+            if current and event["updated_at"] and event["updated_at"] < current["updated_at"]:
+                return False
+
+            self._tickets[event["ticket_id"]] = {
+                "status": event["status"] or (current or {}).get("status"),
+                "updated_at": event["updated_at"] or (current or {}).get("updated_at", ""),
+                "version": (current or {}).get("version", 0) + 1,
+            }
+            self._cond.notify_all()
+            return True
+
+    def get(self, ticket_id: str) -> Dict[str, Any] | None:
+        with self._cond:
+            state = self._tickets.get(str(ticket_id))
+            return dict(state) if state else None
+
+    def wait_for_update(self, ticket_id: str, since_version: int, timeout: float) -> Dict[str, Any] | None:
+        """
+        Block until the ticket's version exceeds ``since_version`` or ``timeout`` passes.
+
+        After the first change, waits out ``COALESCE_WINDOW`` so a burst of
+        events is delivered as a single update.
+        """
+        ticket_id = str(ticket_id)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._tickets.get(ticket_id, {}).get("version", 0) <= since_version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+        time.sleep(COALESCE_WINDOW)
+        return self.get(ticket_id)
+
+
+def _is_fresh(timestamp: str) -> bool:
+    """Zendesk signs with an ISO-8601 timestamp; reject anything too old or unparseable."""
+    try:
+        sent = datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return False
+    return abs(time.time() - sent) <= MAX_SIGNATURE_AGE
+
+
+def _make_handler(store: TicketEventStore, secret: str):
+    class ZendeskWebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != WEBHOOK_PATH:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                length = -1
+            if length < 0 or length > MAX_BODY_BYTES:
+                self.send_response(413 if length > MAX_BODY_BYTES else 400)
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                return
+
+            body = self.rfile.read(length)
+            signature = self.headers.get("X-Zendesk-Webhook-Signature", "")
+            timestamp = self.headers.get("X-Zendesk-Webhook-Signature-Timestamp", "")
+            if not verify_signature(secret, body, signature, timestamp) or not _is_fresh(timestamp):
+                self.send_response(401)
+                self.end_headers()
+                return
+
+            try:
+                event = parse_ticket_event(json.loads(body))
+            except ValueError:
+                event = None
+            if event is None:
+                self.send_response(400)
+                self.end_headers()
+                return
+
+            store.publish(event)
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            # Keep Streamlit's console readable
+            pass
+
+    return ZendeskWebhookHandler
+
+
+def start_webhook_server(secret: str, store: TicketEventStore, host: str = "127.0.0.1",
+                         port: int = 8765) -> ThreadingHTTPServer:
+    """
+    Start the webhook receiver on a daemon thread and return the server.
+
+    Listens on loopback by default; put it behind the reverse proxy that
+    terminates TLS, or pass ``host="0.0.0.0"`` to expose it directly.
+    """
+    server = ThreadingHTTPServer((host, port), _make_handler(store, secret))
+    thread = threading.Thread(target=server.serve_forever, name="zendesk-webhook", daemon=True)
+    thread.start()
+    print(f"[INFO] Zendesk webhook receiver listening on {host}:{port}{WEBHOOK_PATH}")
+    return server